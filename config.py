@@ -17,17 +17,23 @@ class Config:
     LOGS_DIR = BASE_DIR / "logs"
     
     # Supported image formats
-    SUPPORTED_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp']
+    SUPPORTED_FORMATS = frozenset({'.jpg', '.jpeg', '.png', '.bmp'})
     
     # Encryption settings
     AES_KEY_SIZE = 32  # 256 bits
     AES_MODE = 'GCM'
+    AEAD_CACHE_SIZE = 8  # Cipher instances kept per encryptor/decryptor
+    ZSTD_LEVEL = 3  # Payload compression level when zstandard is installed
+    
+    # File I/O settings
+    IO_BUFFER_SIZE = 1024 * 1024  # 1 MiB write buffer for package and image files
     
     # GUI settings
     WINDOW_WIDTH = 1000
     WINDOW_HEIGHT = 650
     MIN_WINDOW_WIDTH = 800
     MIN_WINDOW_HEIGHT = 550
+    THUMBNAIL_CACHE_SIZE = 32  # Decoded previews kept in memory
     
     # Colors (Dark theme)
     PRIMARY_COLOR = "#1f538d"
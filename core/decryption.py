@@ -1,87 +1,277 @@
 """
-Image decryption module for AES-256 encrypted images
+Image decryption module for AES-256-GCM and ChaCha20-Poly1305 encrypted images
 """
 
+import os
 import json
-import base64
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+import mmap
+import logging
+import binascii
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from cryptography.exceptions import InvalidTag
+from config import Config
+from core.package_format import (
+    PACKAGE_MAGIC, PACKAGE_VERSION, PACKAGE_HEADER, AEAD_NONCE_SIZE, AEAD_TAG_SIZE,
+    ALG_AES_GCM, AEAD_ALGORITHMS, COMPRESSION_ZSTD
+)
+from utils.file_utils import match_target_mode
 from utils.logger import get_logger
 
+# zstandard is optional; it is only needed for compressed packages
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 logger = get_logger(__name__)
 
 class ImageDecryptor:
-    """Handles image decryption using AES-256"""
+    """Handles image decryption using AES-256-GCM or ChaCha20-Poly1305"""
     
     def __init__(self):
-        self.backend = default_backend()
+        # AEAD instances by (algorithm, key), so each key schedule is set up once
+        self._aead_cache = OrderedDict()
     
-    def load_encrypted_package(self, encrypted_file_path: str) -> dict:
+    def _get_aead(self, algorithm: str, key: bytes):
         """
-        Load and parse encrypted package from file
+        Get a cached AEAD cipher for algorithm and key
         
         Args:
-            encrypted_file_path: Path to encrypted file
+            algorithm: Algorithm identifier from the package metadata
+            key: 32-byte decryption key
             
         Returns:
+            AESGCM or ChaCha20Poly1305: Cipher bound to key
+        """
+        if algorithm not in AEAD_ALGORITHMS:
+            raise ValueError(f"Unsupported encryption algorithm: {algorithm}")
+        
+        cache_key = (algorithm, bytes(key))
+        aead = self._aead_cache.get(cache_key)
+        if aead is None:
+            aead = AEAD_ALGORITHMS[algorithm](cache_key[1])
+            self._aead_cache[cache_key] = aead
+            if len(self._aead_cache) > Config.AEAD_CACHE_SIZE:
+                self._aead_cache.popitem(last=False)
+        else:
+            self._aead_cache.move_to_end(cache_key)
+        return aead
+    
+    def close(self):
+        """
+        Drop all cached ciphers so keys do not linger in memory
+        """
+        self._aead_cache.clear()
+    
+    @contextmanager
+    def load_encrypted_package(self, source):
+        """
+        Memory-map and parse encrypted package from file
+        
+        The file stays mapped while the context is open, so the ciphertext
+        is read straight from the page cache instead of being copied. A
+        package that is already in memory is parsed in place.
+        
+        Args:
+            source: Path to encrypted file, or the package contents as a
+                bytes-like object
+            
+        Yields:
             dict: Parsed package data
         """
+        package_map = None
         try:
-            with open(encrypted_file_path, 'rb') as f:
-                package_bytes = f.read()
+            if isinstance(source, (str, os.PathLike)):
+                source_name = os.fspath(source)
+                with open(source, 'rb') as f:
+                    # The package is read front to back exactly once
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    package_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    package_map.madvise(mmap.MADV_SEQUENTIAL)
+                package_bytes = package_map
+            else:
+                source_name = "memory"
+                package_bytes = source
             
-            # Decode JSON
-            package_json = package_bytes.decode('utf-8')
-            package = json.loads(package_json)
+            if package_bytes[:len(PACKAGE_MAGIC)] == PACKAGE_MAGIC:
+                package = self._parse_binary_package(package_bytes)
+            else:
+                # Packages written before the binary format are base64 JSON
+                package = self._parse_legacy_package(bytes(package_bytes))
             
-            logger.info(f"Loaded encrypted package from: {encrypted_file_path}")
-            
-            return package
+            logger.info("Loaded encrypted package from: %s", source_name)
             
         except Exception as e:
-            logger.error(f"Failed to load encrypted package: {str(e)}")
+            if package_map is not None:
+                package_map.close()
+            logger.error("Failed to load encrypted package: %s", e)
             raise Exception(f"Failed to load encrypted package: {str(e)}")
+        
+        try:
+            yield package
+        finally:
+            # Views into the map must be released before it can be closed
+            if isinstance(package['ciphertext'], memoryview):
+                package['ciphertext'].release()
+            if package_map is not None:
+                package_map.close()
     
-    def decrypt_image_data(self, ciphertext: bytes, key: bytes, 
-                          nonce: bytes, tag: bytes) -> bytes:
+    def inspect_package(self, encrypted_file_path: str) -> dict:
         """
-        Decrypt image data using AES-256-GCM
+        Read only the fixed header of a package to validate and describe it
         
         Args:
-            ciphertext: Encrypted image data
-            key: 32-byte decryption key
-            nonce: Nonce used during encryption
-            tag: Authentication tag
+            encrypted_file_path: Path to encrypted file
             
         Returns:
-            bytes: Decrypted image data
+            dict: File size, package version and image shape (both None
+                for legacy JSON packages)
         """
         try:
-            # Create cipher
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.GCM(nonce, tag),
-                backend=self.backend
-            )
-            
-            # Decrypt the data
-            decryptor = cipher.decryptor()
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+            with open(encrypted_file_path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                header = f.read(PACKAGE_HEADER.size)
             
-            logger.info(f"Successfully decrypted {len(plaintext)} bytes of image data")
+            if header[:len(PACKAGE_MAGIC)] == PACKAGE_MAGIC:
+                if len(header) < PACKAGE_HEADER.size:
+                    raise ValueError("Truncated package header")
+                (_, version, _, _, _,
+                 width, height, channels) = PACKAGE_HEADER.unpack(header)
+                if version != PACKAGE_VERSION:
+                    raise ValueError(f"Unsupported package version: {version}")
+                image_shape = (width, height, channels)
+            elif header.lstrip()[:1] == b'{':
+                # Legacy JSON packages carry no fixed header
+                version = None
+                image_shape = None
+            else:
+                raise ValueError("Not an encrypted image package")
             
-            return plaintext
+            return {
+                'file_size': file_size,
+                'version': version,
+                'image_shape': image_shape
+            }
             
         except Exception as e:
-            logger.error(f"Decryption failed: {str(e)}")
-            raise Exception(f"Decryption failed - Invalid key or corrupted data: {str(e)}")
+            logger.error("Failed to inspect encrypted package: %s", e)
+            raise Exception(f"Failed to inspect encrypted package: {str(e)}")
+    
+    def _parse_binary_package(self, package_bytes) -> dict:
+        """
+        Split a binary package into its fields without copying the ciphertext
+        
+        Args:
+            package_bytes: Raw package contents
+            
+        Returns:
+            dict: Package fields with the ciphertext as a memoryview
+        """
+        if len(package_bytes) < PACKAGE_HEADER.size:
+            raise ValueError("Truncated package header")
+        (_, version, nonce_len, tag_len, meta_len,
+         width, height, channels) = PACKAGE_HEADER.unpack_from(package_bytes, 0)
+        if version != PACKAGE_VERSION:
+            raise ValueError(f"Unsupported package version: {version}")
+        if nonce_len != AEAD_NONCE_SIZE or tag_len != AEAD_TAG_SIZE:
+            raise ValueError("Corrupt package header")
+        
+        # Plain slices here: a memoryview alive in a traceback would keep
+        # the mmap exported and stop the caller from closing it
+        offset = PACKAGE_HEADER.size
+        nonce = bytes(package_bytes[offset:offset + nonce_len])
+        offset += nonce_len
+        metadata = json.loads(bytes(package_bytes[offset:offset + meta_len]))
+        metadata['image_shape'] = (width, height, channels)
+        offset += meta_len
+        
+        # The tag trails the ciphertext, which is the layout AESGCM expects
+        return {
+            'metadata': metadata,
+            'nonce': nonce,
+            'ciphertext': memoryview(package_bytes)[offset:]
+        }
     
-    def decrypt_package(self, encrypted_file_path: str, key: bytes) -> tuple:
+    def _parse_legacy_package(self, package_bytes: bytes) -> dict:
+        """
+        Parse a JSON package with base64 encoded fields
+        
+        Args:
+            package_bytes: Raw package contents
+            
+        Returns:
+            dict: Package fields with decoded nonce and ciphertext (tag appended)
+        """
+        package = json.loads(package_bytes)
+        
+        # a2b_base64 takes the ASCII strings directly, skipping an encode() copy
+        ciphertext = binascii.a2b_base64(package['ciphertext'])
+        tag = binascii.a2b_base64(package['tag'])
+        
+        return {
+            'metadata': package['metadata'],
+            'nonce': binascii.a2b_base64(package['nonce']),
+            'ciphertext': ciphertext + tag
+        }
+    
+    def decrypt_image_data(self, ciphertext: bytes, key: bytes, nonce: bytes,
+                          algorithm: str = ALG_AES_GCM) -> bytes:
+        """
+        Decrypt image data using the AEAD algorithm it was encrypted with
+        
+        Args:
+            ciphertext: Encrypted image data with the authentication tag appended
+            key: 32-byte decryption key
+            nonce: Nonce used during encryption
+            algorithm: Algorithm identifier from the package metadata
+            
+        Returns:
+            bytes: Decrypted image data
+        """
+        try:
+            plaintext = self._get_aead(algorithm, key).decrypt(nonce, ciphertext, None)
+        except InvalidTag:
+            # InvalidTag carries no message of its own
+            raise ValueError("Decryption failed - Invalid key or corrupted data") from None
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully decrypted %d bytes of image data", len(plaintext))
+        
+        return plaintext
+    
+    def _decompress_payload(self, payload: bytes, compression: str) -> bytes:
+        """
+        Undo the compression recorded in the package metadata
+        
+        Args:
+            payload: Decrypted payload
+            compression: Compression identifier, or None
+            
+        Returns:
+            bytes: Raw image bytes
+        """
+        if compression is None:
+            return payload
+        
+        if compression != COMPRESSION_ZSTD:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if not ZSTD_AVAILABLE:
+            raise ValueError("This package is zstd-compressed; install 'zstandard' to decrypt it")
+        
+        return zstandard.ZstdDecompressor().decompress(payload)
+    
+    def decrypt_package(self, source, key: bytes) -> tuple:
         """
         Decrypt a complete encrypted package
         
         Args:
-            encrypted_file_path: Path to encrypted file
+            source: Path to encrypted file, or the package contents as a
+                bytes-like object
             key: Decryption key
             
         Returns:
@@ -89,23 +279,23 @@ class ImageDecryptor:
         """
         try:
             # Load the encrypted package
-            package = self.load_encrypted_package(encrypted_file_path)
-            
-            # Extract components
-            metadata = package['metadata']
-            nonce = base64.b64decode(package['nonce'].encode('utf-8'))
-            tag = base64.b64decode(package['tag'].encode('utf-8'))
-            ciphertext = base64.b64decode(package['ciphertext'].encode('utf-8'))
+            with self.load_encrypted_package(source) as package:
+                metadata = package['metadata']
+                
+                # Decrypt the image data; packages without 'alg' predate ChaCha20 support
+                image_data = self.decrypt_image_data(
+                    package['ciphertext'], key, package['nonce'],
+                    metadata.get('alg', ALG_AES_GCM)
+                )
             
-            # Decrypt the image data
-            image_data = self.decrypt_image_data(ciphertext, key, nonce, tag)
+            image_data = self._decompress_payload(image_data, metadata.get('compressed'))
             
-            logger.info(f"Successfully decrypted package: {metadata['original_filename']}")
+            logger.info("Successfully decrypted package: %s", metadata['original_filename'])
             
             return image_data, metadata
             
         except Exception as e:
-            logger.error(f"Failed to decrypt package: {str(e)}")
+            logger.error("Failed to decrypt package: %s", e)
             raise Exception(f"Failed to decrypt package: {str(e)}")
     
     def save_decrypted_image(self, image_data: bytes, output_path: str):
@@ -117,11 +307,21 @@ class ImageDecryptor:
             output_path: Output file path
         """
         try:
-            with open(output_path, 'wb') as f:
-                f.write(image_data)
+            # Write next to the destination and rename into place, so the move
+            # stays on one filesystem and a failed write leaves no partial file
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb', buffering=Config.IO_BUFFER_SIZE) as f:
+                    f.write(image_data)
+                match_target_mode(tmp_path, output_path)
+                os.replace(tmp_path, output_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
             
-            logger.info(f"Decrypted image saved to: {output_path}")
+            logger.info("Decrypted image saved to: %s", output_path)
             
         except Exception as e:
-            logger.error(f"Failed to save decrypted image: {str(e)}")
+            logger.error("Failed to save decrypted image: %s", e)
             raise Exception(f"Failed to save decrypted image: {str(e)}")
@@ -1,60 +1,197 @@
 """
-Image encryption module using AES-256 encryption
+Image encryption module using AES-256-GCM or ChaCha20-Poly1305
 """
 
 import os
 import json
-import base64
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+import logging
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from config import Config
+from core.package_format import (
+    PACKAGE_MAGIC, PACKAGE_VERSION, PACKAGE_HEADER, AEAD_NONCE_SIZE, AEAD_TAG_SIZE,
+    ALG_AES_GCM, ALG_CHACHA20_POLY1305, AEAD_ALGORITHMS, COMPRESSION_ZSTD
+)
+from utils.file_utils import match_target_mode
 from utils.logger import get_logger
 
+# zstandard is optional; without it payloads are stored uncompressed
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 logger = get_logger(__name__)
 
+@lru_cache(maxsize=None)
+def has_hardware_aes() -> bool:
+    """
+    Check whether the CPU provides AES and carry-less multiply instructions
+    
+    Returns:
+        bool: False only when the CPU is known to lack them
+    """
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            cpuinfo = f.read()
+    except OSError:
+        # No cpuinfo outside Linux; assume a CPU with AES-NI / ARMv8 crypto
+        return True
+    
+    for line in cpuinfo.splitlines():
+        # x86 lists 'flags', ARM lists 'Features'
+        if line.startswith(('flags', 'Features')):
+            flags = set(line.partition(':')[2].split())
+            return 'aes' in flags and ('pclmulqdq' in flags or 'pmull' in flags)
+    
+    return True
+
 class ImageEncryptor:
-    """Handles image encryption using AES-256"""
+    """Handles image encryption using AES-256-GCM or ChaCha20-Poly1305"""
     
-    def __init__(self):
-        self.backend = default_backend()
+    def __init__(self, algorithm: str = None):
+        # Software AES-GCM is several times slower than ChaCha20-Poly1305
+        if algorithm is None:
+            algorithm = ALG_AES_GCM if has_hardware_aes() else ALG_CHACHA20_POLY1305
+        if algorithm not in AEAD_ALGORITHMS:
+            raise ValueError(f"Unsupported encryption algorithm: {algorithm}")
+        self.algorithm = algorithm
+        
+        # AEAD instances by key, so the key schedule is set up once per key
+        self._aead_cache = OrderedDict()
+        
+        logger.info("Using %s for encryption", self.algorithm)
     
-    def encrypt_image_data(self, image_data: bytes, key: bytes) -> tuple:
+    def _get_aead(self, key: bytes):
         """
-        Encrypt image data using AES-256-GCM
+        Get a cached AEAD cipher for key
         
         Args:
-            image_data: Raw image bytes
             key: 32-byte encryption key
             
         Returns:
-            tuple: (encrypted_data, nonce, tag)
+            AESGCM or ChaCha20Poly1305: Cipher bound to key
         """
-        try:
-            # Generate a random nonce for GCM mode
-            nonce = os.urandom(12)  # GCM uses 12-byte nonce
-            
-            # Create cipher
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.GCM(nonce),
-                backend=self.backend
-            )
-            
-            # Encrypt the data
-            encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(image_data) + encryptor.finalize()
+        cache_key = bytes(key)
+        aead = self._aead_cache.get(cache_key)
+        if aead is None:
+            # Checked once per key; cache hits skip validation entirely
+            if len(cache_key) != Config.AES_KEY_SIZE:
+                raise ValueError(f"Invalid key size: {len(cache_key)} bytes (expected {Config.AES_KEY_SIZE})")
+            aead = AEAD_ALGORITHMS[self.algorithm](cache_key)
+            self._aead_cache[cache_key] = aead
+            if len(self._aead_cache) > Config.AEAD_CACHE_SIZE:
+                self._aead_cache.popitem(last=False)
+        else:
+            self._aead_cache.move_to_end(cache_key)
+        return aead
+    
+    def close(self):
+        """
+        Drop all cached ciphers so keys do not linger in memory
+        """
+        self._aead_cache.clear()
+    
+    def encrypt_image_data(self, image_data: bytes, key: bytes, nonce: bytes,
+                           output_buffer=None) -> bytes:
+        """
+        Encrypt image data with the selected AEAD algorithm
+        
+        Args:
+            image_data: Raw image bytes
+            key: 32-byte encryption key
+            nonce: 12-byte nonce
+            output_buffer: Optional writable buffer of len(image_data) + 16 bytes
+                to encrypt into instead of allocating a new bytes object
             
-            logger.info(f"Successfully encrypted {len(image_data)} bytes of image data")
+        Returns:
+            bytes: Ciphertext with the authentication tag appended
+                (output_buffer itself when one is given)
+        """
+        aead = self._get_aead(key)
+        if output_buffer is None:
+            ciphertext = aead.encrypt(nonce, image_data, None)
+        elif hasattr(aead, 'encrypt_into'):
+            aead.encrypt_into(nonce, image_data, None, output_buffer)
+            ciphertext = output_buffer
+        else:
+            # cryptography releases without encrypt_into
+            output_buffer[:] = aead.encrypt(nonce, image_data, None)
+            ciphertext = output_buffer
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully encrypted %d bytes of image data", len(image_data))
+        
+        return ciphertext
+    
+    def _compress_payload(self, image_data: bytes) -> tuple:
+        """
+        Compress raw pixel data before encryption when zstandard is available
+        
+        Args:
+            image_data: Raw image bytes
             
-            return ciphertext, nonce, encryptor.tag
+        Returns:
+            tuple: (payload, compression) where compression is None if the
+                data was left as is
+        """
+        if not ZSTD_AVAILABLE:
+            return image_data, None
+        
+        # Compressor objects are not thread-safe and encryptions can overlap
+        compressor = zstandard.ZstdCompressor(level=Config.ZSTD_LEVEL)
+        compressed = compressor.compress(image_data)
+        if len(compressed) >= len(image_data):
+            # Noise-like pixel data does not compress
+            return image_data, None
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Compressed image data from %d to %d bytes", len(image_data), len(compressed))
+        
+        return compressed, COMPRESSION_ZSTD
+    
+    def _build_package_prefix(self, nonce: bytes, original_filename: str,
+                              image_shape: tuple, compression: str = None) -> bytearray:
+        """
+        Build the package header, nonce and metadata that precede the ciphertext
+        
+        Args:
+            nonce: Nonce used for encryption
+            original_filename: Original image filename
+            image_shape: Image dimensions (width, height, channels)
+            compression: Compression applied to the payload, if any
             
-        except Exception as e:
-            logger.error(f"Encryption failed: {str(e)}")
-            raise Exception(f"Encryption failed: {str(e)}")
+        Returns:
+            bytearray: Package prefix
+        """
+        # Create metadata; the image shape goes in the fixed header
+        metadata = {
+            'original_filename': original_filename,
+            'alg': self.algorithm
+        }
+        if compression:
+            metadata['compressed'] = compression
+        metadata_bytes = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+        width, height, channels = image_shape
+        
+        # Pack straight into one buffer instead of concatenating the pieces
+        nonce_offset = PACKAGE_HEADER.size
+        metadata_offset = nonce_offset + len(nonce)
+        prefix = bytearray(metadata_offset + len(metadata_bytes))
+        PACKAGE_HEADER.pack_into(
+            prefix, 0,
+            PACKAGE_MAGIC, PACKAGE_VERSION,
+            len(nonce), AEAD_TAG_SIZE, len(metadata_bytes),
+            width, height, channels
+        )
+        prefix[nonce_offset:metadata_offset] = nonce
+        prefix[metadata_offset:] = metadata_bytes
+        return prefix
     
     def create_encrypted_package(self, image_data: bytes, key: bytes, 
-                                original_filename: str, image_shape: tuple) -> bytes:
+                                original_filename: str, image_shape: tuple) -> bytearray:
         """
         Create an encrypted package containing image data and metadata
         
@@ -65,37 +202,69 @@ class ImageEncryptor:
             image_shape: Image dimensions (width, height, channels)
             
         Returns:
-            bytes: Complete encrypted package
+            bytearray: Complete encrypted package
         """
         try:
-            # Encrypt the image data
-            ciphertext, nonce, tag = self.encrypt_image_data(image_data, key)
+            payload, compression = self._compress_payload(image_data)
+            nonce = os.urandom(AEAD_NONCE_SIZE)
+            prefix = self._build_package_prefix(nonce, original_filename, image_shape, compression)
+            
+            # Encrypt into the tail of a buffer sized for the whole package
+            package = bytearray(len(prefix) + len(payload) + AEAD_TAG_SIZE)
+            package[:len(prefix)] = prefix
+            with memoryview(package) as view, view[len(prefix):] as ciphertext_view:
+                self.encrypt_image_data(payload, key, nonce, ciphertext_view)
             
-            # Create metadata
-            metadata = {
-                'original_filename': original_filename,
-                'image_shape': image_shape,
-                'version': '1.0'
-            }
+            logger.info("Created encrypted package for %s", original_filename)
             
-            # Create the package
-            package = {
-                'metadata': metadata,
-                'nonce': base64.b64encode(nonce).decode('utf-8'),
-                'tag': base64.b64encode(tag).decode('utf-8'),
-                'ciphertext': base64.b64encode(ciphertext).decode('utf-8')
-            }
+            return package
+            
+        except Exception as e:
+            logger.error("Failed to create encrypted package: %s", e)
+            raise Exception(f"Failed to create encrypted package: {str(e)}")
+    
+    def encrypt_to_file(self, image_data: bytes, key: bytes, original_filename: str,
+                        image_shape: tuple, output_path: str):
+        """
+        Encrypt image data and write the package file
+        
+        The ciphertext is written with ordinary writes rather than through a
+        memory map, so a full disk raises OSError instead of SIGBUS.
+        
+        Args:
+            image_data: Raw image bytes
+            key: Encryption key
+            original_filename: Original image filename
+            image_shape: Image dimensions (width, height, channels)
+            output_path: Output file path
+        """
+        try:
+            # Reject a bad key before any file is created
+            self._get_aead(key)
             
-            # Convert to JSON and encode
-            package_json = json.dumps(package, indent=2)
-            package_bytes = package_json.encode('utf-8')
+            payload, compression = self._compress_payload(image_data)
+            nonce = os.urandom(AEAD_NONCE_SIZE)
+            prefix = self._build_package_prefix(nonce, original_filename, image_shape, compression)
+            ciphertext = self.encrypt_image_data(payload, key, nonce)
             
-            logger.info(f"Created encrypted package for {original_filename}")
+            # Write a temporary file and rename it into place, so a failure
+            # never leaves a partial package or clobbers an existing one
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb', buffering=Config.IO_BUFFER_SIZE) as f:
+                    f.write(prefix)
+                    f.write(ciphertext)
+                match_target_mode(tmp_path, output_path)
+                os.replace(tmp_path, output_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
             
-            return package_bytes
+            logger.info("Encrypted file saved to: %s", output_path)
             
         except Exception as e:
-            logger.error(f"Failed to create encrypted package: {str(e)}")
+            logger.error("Failed to create encrypted package: %s", e)
             raise Exception(f"Failed to create encrypted package: {str(e)}")
     
     def save_encrypted_file(self, package_bytes: bytes, output_path: str):
@@ -107,11 +276,11 @@ class ImageEncryptor:
             output_path: Output file path
         """
         try:
-            with open(output_path, 'wb') as f:
+            with open(output_path, 'wb', buffering=Config.IO_BUFFER_SIZE) as f:
                 f.write(package_bytes)
             
-            logger.info(f"Encrypted file saved to: {output_path}")
+            logger.info("Encrypted file saved to: %s", output_path)
             
         except Exception as e:
-            logger.error(f"Failed to save encrypted file: {str(e)}")
+            logger.error("Failed to save encrypted file: %s", e)
             raise Exception(f"Failed to save encrypted file: {str(e)}")
@@ -4,20 +4,29 @@ Key management for encryption and decryption operations
 
 import os
 import base64
-import secrets
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+import binascii
+import hashlib
+from collections import OrderedDict
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# PBKDF2-HMAC-SHA256 iteration count (OWASP recommended minimum)
+PBKDF2_ITERATIONS = 100000
+
+# Number of password-derived keys kept in memory per KeyManager
+KDF_CACHE_SIZE = 32
+
 class KeyManager:
     """Manages encryption keys and key derivation"""
     
     def __init__(self):
-        self.backend = default_backend()
         self.key_size = 32  # 256 bits for AES-256
+        
+        # LRU of derived keys keyed by (password digest, salt); the digest is
+        # keyed with a per-process secret so passwords are never stored
+        self._kdf_cache = OrderedDict()
+        self._kdf_cache_secret = os.urandom(16)
     
     def generate_random_key(self) -> bytes:
         """
@@ -27,12 +36,12 @@ class KeyManager:
             bytes: 32-byte random key for AES-256
         """
         try:
-            key = secrets.token_bytes(self.key_size)
+            key = os.urandom(self.key_size)
             logger.info("Generated new random encryption key")
             return key
             
         except Exception as e:
-            logger.error(f"Failed to generate random key: {str(e)}")
+            logger.error("Failed to generate random key: %s", e)
             raise Exception(f"Failed to generate random key: {str(e)}")
     
     def derive_key_from_password(self, password: str, salt: bytes = None) -> tuple:
@@ -50,25 +59,40 @@ class KeyManager:
             if salt is None:
                 salt = os.urandom(16)
             
-            # Create PBKDF2 instance
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=self.key_size,
-                salt=salt,
-                iterations=100000,  # OWASP recommended minimum
-                backend=self.backend
+            password_bytes = password.encode('utf-8')
+            cache_key = (
+                hashlib.blake2b(password_bytes, key=self._kdf_cache_secret, digest_size=16).digest(),
+                salt
             )
+            key = self._kdf_cache.get(cache_key)
+            if key is not None:
+                self._kdf_cache.move_to_end(cache_key)
+                logger.debug("Reused cached key derived from password")
+                return key, salt
             
-            # Derive key
-            key = kdf.derive(password.encode('utf-8'))
+            # Derive key with OpenSSL's PBKDF2 loop via hashlib
+            key = hashlib.pbkdf2_hmac(
+                'sha256', password_bytes, salt, PBKDF2_ITERATIONS, dklen=self.key_size
+            )
+            
+            self._kdf_cache[cache_key] = key
+            if len(self._kdf_cache) > KDF_CACHE_SIZE:
+                self._kdf_cache.popitem(last=False)
             
             logger.info("Derived encryption key from password")
             return key, salt
             
         except Exception as e:
-            logger.error(f"Failed to derive key from password: {str(e)}")
+            logger.error("Failed to derive key from password: %s", e)
             raise Exception(f"Failed to derive key from password: {str(e)}")
     
+    def clear_cache(self):
+        """
+        Forget all cached password-derived keys
+        """
+        self._kdf_cache.clear()
+        logger.debug("Cleared derived key cache")
+    
     def key_to_string(self, key: bytes) -> str:
         """
         Convert key bytes to base64 string for display/storage
@@ -79,14 +103,9 @@ class KeyManager:
         Returns:
             str: Base64 encoded key string
         """
-        try:
-            key_string = base64.b64encode(key).decode('utf-8')
-            logger.debug("Converted key to string format")
-            return key_string
-            
-        except Exception as e:
-            logger.error(f"Failed to convert key to string: {str(e)}")
-            raise Exception(f"Failed to convert key to string: {str(e)}")
+        key_string = base64.b64encode(key).decode('utf-8')
+        logger.debug("Converted key to string format")
+        return key_string
     
     def string_to_key(self, key_string: str) -> bytes:
         """
@@ -98,23 +117,28 @@ class KeyManager:
         Returns:
             bytes: Key bytes
         """
+        # Remove any whitespace
+        key_string = key_string.strip()
+        
+        # Reject wrong lengths before decoding; base64 of 32 bytes is 44 chars ending in '='
+        expected_length = 4 * ((self.key_size + 2) // 3)
+        if len(key_string) != expected_length or not key_string.endswith('='):
+            raise ValueError(
+                f"Invalid key length: {len(key_string)} characters (expected {expected_length})"
+            )
+        
+        # Decode base64
         try:
-            # Remove any whitespace
-            key_string = key_string.strip()
-            
-            # Decode base64
             key = base64.b64decode(key_string.encode('utf-8'))
-            
-            # Validate key length
-            if len(key) != self.key_size:
-                raise ValueError(f"Invalid key length: {len(key)} bytes (expected {self.key_size})")
-            
-            logger.debug("Converted string to key format")
-            return key
-            
-        except Exception as e:
-            logger.error(f"Failed to convert string to key: {str(e)}")
-            raise Exception(f"Invalid key format: {str(e)}")
+        except binascii.Error as e:
+            raise ValueError(f"Invalid key format: {str(e)}") from None
+        
+        # Validate key length
+        if len(key) != self.key_size:
+            raise ValueError(f"Invalid key length: {len(key)} bytes (expected {self.key_size})")
+        
+        logger.debug("Converted string to key format")
+        return key
     
     def validate_key(self, key: bytes) -> bool:
         """
@@ -126,14 +150,9 @@ class KeyManager:
         Returns:
             bool: True if valid, False otherwise
         """
-        try:
-            is_valid = len(key) == self.key_size
-            if is_valid:
-                logger.debug("Key validation passed")
-            else:
-                logger.warning(f"Key validation failed: {len(key)} bytes (expected {self.key_size})")
-            return is_valid
-            
-        except Exception as e:
-            logger.error(f"Key validation error: {str(e)}")
-            return False
+        is_valid = len(key) == self.key_size
+        if is_valid:
+            logger.debug("Key validation passed")
+        else:
+            logger.warning("Key validation failed: %d bytes (expected %d)", len(key), self.key_size)
+        return is_valid
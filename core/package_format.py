@@ -0,0 +1,33 @@
+"""
+Binary container format for encrypted image packages
+"""
+
+import struct
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+# Package layout:
+#   header | nonce | metadata (UTF-8 JSON) | ciphertext | tag
+#
+# The tag trails the ciphertext so packages can be written in a single pass.
+# Numeric fields live in the fixed header; the metadata block only carries
+# strings (filename, algorithm id) and stays JSON so any install can read it.
+#
+# Header fields: magic, format version, nonce length, tag length, metadata length,
+# image width, image height, image channels
+PACKAGE_MAGIC = b'ICRY'
+PACKAGE_VERSION = 4
+PACKAGE_HEADER = struct.Struct('<4sBHHI3I')
+
+AEAD_NONCE_SIZE = 12
+AEAD_TAG_SIZE = 16
+
+# AEAD algorithms by the identifier stored in the package metadata
+ALG_AES_GCM = 'AES-256-GCM'
+ALG_CHACHA20_POLY1305 = 'CHACHA20-POLY1305'
+AEAD_ALGORITHMS = {
+    ALG_AES_GCM: AESGCM,
+    ALG_CHACHA20_POLY1305: ChaCha20Poly1305
+}
+
+# Payload compression applied before encryption, recorded as metadata['compressed']
+COMPRESSION_ZSTD = 'zstd'
@@ -0,0 +1,10 @@
+"""
+Shared pytest setup
+"""
+
+import sys
+from pathlib import Path
+
+# Make the project modules importable the same way main.py does
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
@@ -0,0 +1,103 @@
+"""
+Round-trip and failure tests for encrypted image packages
+"""
+
+import os
+import json
+import base64
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from core.decryption import ImageDecryptor
+from core.encryption import ImageEncryptor
+from core.package_format import PACKAGE_HEADER, AEAD_TAG_SIZE
+from utils.image_utils import ImageProcessor
+
+KEY = bytes(range(32))
+IMAGE_SHAPE = (4, 3, 3)
+IMAGE_DATA = bytes(range(36))
+
+def test_encrypt_to_file_round_trip(tmp_path):
+    package_path = tmp_path / "image.png.enc"
+    ImageEncryptor().encrypt_to_file(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE, str(package_path))
+
+    image_data, metadata = ImageDecryptor().decrypt_package(str(package_path), KEY)
+
+    assert bytes(image_data) == IMAGE_DATA
+    assert metadata['original_filename'] == "image.png"
+    assert tuple(metadata['image_shape']) == IMAGE_SHAPE
+    # Only the package itself is left; the temporary file was renamed into place
+    assert os.listdir(tmp_path) == ["image.png.enc"]
+
+def test_encrypt_to_file_keeps_existing_package_on_failure(tmp_path):
+    package_path = tmp_path / "image.png.enc"
+    encryptor = ImageEncryptor()
+    encryptor.encrypt_to_file(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE, str(package_path))
+    original = package_path.read_bytes()
+
+    with pytest.raises(Exception, match="Invalid key size"):
+        encryptor.encrypt_to_file(IMAGE_DATA, KEY[:16], "image.png", IMAGE_SHAPE, str(package_path))
+
+    assert package_path.read_bytes() == original
+    assert os.listdir(tmp_path) == ["image.png.enc"]
+
+def test_in_memory_package_round_trip():
+    package = ImageEncryptor().create_encrypted_package(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE)
+
+    image_data, _ = ImageDecryptor().decrypt_package(bytes(package), KEY)
+
+    assert bytes(image_data) == IMAGE_DATA
+
+def test_wrong_key_is_rejected():
+    package = ImageEncryptor().create_encrypted_package(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE)
+
+    with pytest.raises(Exception, match="Invalid key or corrupted data"):
+        ImageDecryptor().decrypt_package(bytes(package), bytes(32))
+
+def test_legacy_json_package_decrypts(tmp_path):
+    # Layout written before the binary format: base64 fields, AES-GCM, no 'alg'
+    nonce = os.urandom(12)
+    sealed = AESGCM(KEY).encrypt(nonce, IMAGE_DATA, None)
+    package = {
+        'metadata': {
+            'original_filename': "legacy.png",
+            'image_shape': list(IMAGE_SHAPE),
+            'version': '1.0'
+        },
+        'nonce': base64.b64encode(nonce).decode('utf-8'),
+        'tag': base64.b64encode(sealed[-AEAD_TAG_SIZE:]).decode('utf-8'),
+        'ciphertext': base64.b64encode(sealed[:-AEAD_TAG_SIZE]).decode('utf-8')
+    }
+    package_path = tmp_path / "legacy.png.enc"
+    package_path.write_text(json.dumps(package, indent=2))
+
+    image_data, metadata = ImageDecryptor().decrypt_package(str(package_path), KEY)
+
+    assert bytes(image_data) == IMAGE_DATA
+    assert metadata['original_filename'] == "legacy.png"
+
+def test_truncated_header_is_rejected():
+    package = ImageEncryptor().create_encrypted_package(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE)
+    truncated = bytes(package[:PACKAGE_HEADER.size - 1])
+
+    with pytest.raises(ValueError, match="Truncated package header"):
+        ImageDecryptor()._parse_binary_package(truncated)
+    with pytest.raises(Exception, match="Truncated package header"):
+        ImageDecryptor().decrypt_package(truncated, KEY)
+
+def test_corrupt_metadata_reports_the_parse_error(tmp_path):
+    package = ImageEncryptor().create_encrypted_package(IMAGE_DATA, KEY, "image.png", IMAGE_SHAPE)
+    # First metadata byte, just past the header and the 12-byte nonce
+    package[PACKAGE_HEADER.size + 12] ^= 0xFF
+    package_path = tmp_path / "corrupt.enc"
+    package_path.write_bytes(package)
+
+    with pytest.raises(Exception) as excinfo:
+        ImageDecryptor().decrypt_package(str(package_path), KEY)
+
+    assert "exported pointers" not in str(excinfo.value)
+
+def test_bytes_to_image_rejects_wrong_length():
+    with pytest.raises(Exception, match="does not match image dimensions"):
+        ImageProcessor().bytes_to_image(IMAGE_DATA[:-1], IMAGE_SHAPE)
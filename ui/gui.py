@@ -6,11 +6,11 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import os
 import shutil
 from pathlib import Path
-from PIL import Image, ImageTk
-import pyperclip
 
 # Try to import tkinterdnd2 for drag and drop, fallback gracefully
 try:
@@ -106,19 +106,59 @@ class ProgressDialog(ctk.CTkToplevel):
         
         # Cancel button
         self.cancel_button = ctk.CTkButton(
-            self, text="Cancel", command=self.destroy,
+            self, text="Cancel", command=self.set_cancelled,
             width=100, height=30
         )
         self.cancel_button.pack(pady=10)
         
         self.cancelled = False
+        self._last_update = 0.0
+        
+        # Latest (value, status) not yet shown; one flush at a time is scheduled
+        self._pending_progress = None
+        self._progress_lock = threading.Lock()
     
     def update_progress(self, value, status=""):
-        """Update progress bar and status"""
+        """Update progress bar and status; safe to call from worker threads"""
+        with self._progress_lock:
+            # Keep only the newest update, but not at the cost of its status text
+            if not status and self._pending_progress is not None:
+                status = self._pending_progress[1]
+            flush_scheduled = self._pending_progress is not None
+            self._pending_progress = (value, status)
+            if flush_scheduled:
+                return
+            
+            # Updates closer together than 50 ms are not visible, so coalesce
+            # them into one trailing flush; completion is shown at once
+            elapsed = time.monotonic() - self._last_update
+            delay = 0 if value >= 1.0 else max(0, int((0.05 - elapsed) * 1000))
+        
+        # Widgets are only touched on the Tk main loop
+        self.after(delay, self._apply_progress)
+    
+    def _apply_progress(self):
+        """Apply the latest progress update on the main loop"""
+        with self._progress_lock:
+            value, status = self._pending_progress
+            self._pending_progress = None
+            self._last_update = time.monotonic()
+        
+        if self.cancelled or not self.winfo_exists():
+            return
         self.progress.set(value)
         if status:
             self.status_label.configure(text=status)
-        self.update()
+        self.update_idletasks()
+    
+    def close(self):
+        """Close the dialog once queued updates have run; safe from worker threads"""
+        self.after(0, self._close)
+    
+    def _close(self):
+        """Destroy the dialog unless the user already cancelled it"""
+        if not self.cancelled:
+            self.destroy()
     
     def set_cancelled(self):
         """Mark as cancelled"""
@@ -135,15 +175,21 @@ class ImageEncryptorGUI:
         self.key_manager = KeyManager()
         self.image_processor = ImageProcessor()
         
+        # Image decoding and preview work; bounded so rapid re-selection cannot pile up threads
+        self.preview_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="preview")
+        
         # GUI state
         self.current_image = None
         self.current_image_path = None
+        self.current_image_name = None
+        self.pending_image_path = None
         self.encryption_key = None
         self.current_key_string = ""
         self.encrypted_file_path = None
         
         # Setup main window
         self.setup_window()
+        self._init_fonts()
         self.create_widgets()
         
         logger.info("GUI initialized successfully")
@@ -164,6 +210,16 @@ class ImageEncryptorGUI:
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_rowconfigure(0, weight=1)
     
+    def _init_fonts(self):
+        """Create the fonts shared by all widgets"""
+        # Built once after the root window exists, instead of once per widget
+        self._fonts = {
+            'title': ctk.CTkFont(size=24, weight="bold"),
+            'heading': ctk.CTkFont(size=18, weight="bold"),
+            'button': ctk.CTkFont(size=16, weight="bold"),
+            'body': ctk.CTkFont(size=16)
+        }
+    
     def create_widgets(self):
         """Create and layout all GUI widgets"""
         # Main container
@@ -176,7 +232,7 @@ class ImageEncryptorGUI:
         title_label = ctk.CTkLabel(
             self.main_frame, 
             text="🔐 ImageCrypt",
-            font=ctk.CTkFont(size=24, weight="bold")
+            font=self._fonts['title']
         )
         title_label.grid(row=0, column=0, columnspan=2, pady=(20, 30))
         
@@ -185,16 +241,26 @@ class ImageEncryptorGUI:
     
     def create_tabs(self):
         """Create tabbed interface for encryption and decryption"""
-        self.tabview = ctk.CTkTabview(self.main_frame, width=950, height=600)
+        self.tabview = ctk.CTkTabview(
+            self.main_frame, width=950, height=600, command=self._build_decryption_tab
+        )
         self.tabview.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=20, pady=20)
         
         # Encryption tab
         self.encrypt_tab = self.tabview.add("🔒 Encrypt Image")
         self.create_encryption_tab()
         
-        # Decryption tab
+        # Decryption tab; its widgets are built after the first paint, or
+        # straight away if the user switches to it before then
         self.decrypt_tab = self.tabview.add("🔓 Decrypt Image")
-        self.create_decryption_tab()
+        self.decrypt_tab_built = False
+        self.root.after(50, self._build_decryption_tab)
+    
+    def _build_decryption_tab(self):
+        """Create the decryption interface if it has not been built yet"""
+        if not self.decrypt_tab_built:
+            self.decrypt_tab_built = True
+            self.create_decryption_tab()
     
     def create_encryption_tab(self):
         """Create the encryption interface"""
@@ -223,7 +289,7 @@ class ImageEncryptorGUI:
         self.drop_label = ctk.CTkLabel(
             self.image_drop_frame,
             text=drop_text,
-            font=ctk.CTkFont(size=16),
+            font=self._fonts['body'],
             height=150
         )
         self.drop_label.grid(row=0, column=0, pady=50)
@@ -257,7 +323,7 @@ class ImageEncryptorGUI:
         encrypt_title = ctk.CTkLabel(
             right_frame,
             text="🔐 Encryption Settings",
-            font=ctk.CTkFont(size=18, weight="bold")
+            font=self._fonts['heading']
         )
         encrypt_title.grid(row=0, column=0, pady=(20, 10))
         
@@ -301,7 +367,7 @@ class ImageEncryptorGUI:
             text="🔒 Encrypt Image",
             command=self.encrypt_image,
             width=200, height=50,
-            font=ctk.CTkFont(size=16, weight="bold"),
+            font=self._fonts['button'],
             state="disabled"
         )
         self.encrypt_btn.grid(row=2, column=0, pady=30)
@@ -341,7 +407,7 @@ class ImageEncryptorGUI:
         self.encrypted_drop_label = ctk.CTkLabel(
             self.encrypted_drop_frame,
             text=drop_text,
-            font=ctk.CTkFont(size=16),
+            font=self._fonts['body'],
             height=150
         )
         self.encrypted_drop_label.grid(row=0, column=0, pady=50)
@@ -375,7 +441,7 @@ class ImageEncryptorGUI:
         decrypt_title = ctk.CTkLabel(
             right_frame,
             text="🔓 Decryption Settings",
-            font=ctk.CTkFont(size=18, weight="bold")
+            font=self._fonts['heading']
         )
         decrypt_title.grid(row=0, column=0, pady=(20, 10))
         
@@ -390,6 +456,7 @@ class ImageEncryptorGUI:
         # Key input area
         self.key_input = ctk.CTkTextbox(key_input_frame, height=80, wrap="word")
         self.key_input.grid(row=1, column=0, sticky="ew", padx=10, pady=5)
+        self.key_input.bind('<KeyRelease>', lambda e: self.update_decrypt_button_state())
         
         # Paste key button
         paste_key_btn = ctk.CTkButton(
@@ -406,7 +473,7 @@ class ImageEncryptorGUI:
             text="🔓 Decrypt Image",
             command=self.decrypt_image,
             width=200, height=50,
-            font=ctk.CTkFont(size=16, weight="bold"),
+            font=self._fonts['button'],
             state="disabled"
         )
         self.decrypt_btn.grid(row=2, column=0, pady=30)
@@ -469,37 +536,82 @@ class ImageEncryptorGUI:
             self.load_image(file_path)
     
     def load_image(self, file_path):
-        """Load and display the selected image"""
+        """Load the selected image in the background and display it when ready"""
+        # Only the most recent selection is applied if loads overlap
+        self.pending_image_path = file_path
+        self.encrypt_status.configure(text=f"Loading image: {Path(file_path).name}...")
+        
+        self.preview_pool.submit(self._load_image_worker, file_path)
+    
+    def _load_image_worker(self, file_path):
+        """Decode the image and its preview off the Tk main loop"""
         try:
-            # Load image
-            self.current_image = self.image_processor.load_image(file_path)
-            self.current_image_path = file_path
-            
-            # Update preview
-            thumbnail = self.image_processor.create_thumbnail(self.current_image, (250, 250))
-            if thumbnail:
-                self.preview_label.configure(image=thumbnail, text="")
-                # Keep reference to prevent garbage collection
-                self.preview_label._image_ref = thumbnail
+            image = self.image_processor.load_image(file_path)
+            preview = self.image_processor.load_thumbnail(file_path, (250, 250))
+            if preview is None:
+                # load_image only parses the header; the preview is the first decode
+                raise ValueError("Image data is corrupt or truncated")
             
-            # Update drop label
-            filename = Path(file_path).name
-            self.drop_label.configure(text=f"Selected: {filename}")
-            
-            # Update status
-            size = self.current_image.size
-            self.encrypt_status.configure(
-                text=f"Image loaded: {filename}\nSize: {size[0]}x{size[1]} pixels\nGenerate a key to encrypt"
-            )
-            
-            # Enable encrypt button if key is available
-            self.update_encrypt_button_state()
-            
-            logger.info(f"Image loaded for encryption: {file_path}")
+            # Tk objects, including PhotoImage, must be created on the main thread
+            self.root.after(0, lambda: self._apply_loaded_image(file_path, image, preview))
             
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load image:\n{str(e)}")
-            logger.error(f"Failed to load image {file_path}: {str(e)}")
+            error_message = str(e)
+            logger.error(f"Failed to load image {file_path}: {error_message}")
+            self.root.after(0, lambda: self._show_image_load_error(file_path, error_message))
+    
+    def _apply_loaded_image(self, file_path, image, preview):
+        """Display an image decoded by the load worker"""
+        if file_path != self.pending_image_path:
+            return
+        
+        self.current_image = image
+        self.current_image_path = file_path
+        
+        # Update preview
+        self._set_preview_image(self.preview_label, preview)
+        
+        # Update drop label; the name is kept for naming the encrypted package
+        filename = Path(file_path).name
+        self.current_image_name = filename
+        self.drop_label.configure(text=f"Selected: {filename}")
+        
+        # Update status
+        size = self.current_image.size
+        self.encrypt_status.configure(
+            text=f"Image loaded: {filename}\nSize: {size[0]}x{size[1]} pixels\nGenerate a key to encrypt"
+        )
+        
+        # Enable encrypt button if key is available
+        self.update_encrypt_button_state()
+        
+        logger.info(f"Image loaded for encryption: {file_path}")
+    
+    def _show_image_load_error(self, file_path, error_message):
+        """Report a failed background image load"""
+        if file_path != self.pending_image_path:
+            return
+        
+        self.encrypt_status.configure(text="Select an image and generate a key to begin")
+        messagebox.showerror("Error", f"Failed to load image:\n{error_message}")
+    
+    def _set_preview_image(self, label, image):
+        """Show a preview image, repainting the label's current photo when size and mode match"""
+        photo = getattr(label, '_image_ref', None)
+        if (photo is not None and (photo.width(), photo.height()) == image.size
+                and getattr(label, '_image_mode', None) == image.mode):
+            # Same Tk image, new pixels; no new photo buffer or label reconfigure.
+            # paste() converts to the photo's mode, so the mode must match too
+            photo.paste(image)
+            return
+        
+        # Deferred: ImageTk loads PIL's Tk bridge, which the first paint does not need
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(image)
+        label.configure(image=photo, text="")
+        # Keep reference to prevent garbage collection
+        label._image_ref = photo
+        label._image_mode = image.mode
     
     def generate_key(self):
         """Generate a new encryption key"""
@@ -529,7 +641,9 @@ class ImageEncryptorGUI:
         """Copy the encryption key to clipboard"""
         if self.current_key_string:
             try:
-                pyperclip.copy(self.current_key_string)
+                # Tk's own clipboard avoids spawning xclip/pbcopy per copy
+                self.root.clipboard_clear()
+                self.root.clipboard_append(self.current_key_string)
                 messagebox.showinfo("Success", "Encryption key copied to clipboard!")
                 logger.info("Encryption key copied to clipboard")
             except Exception as e:
@@ -539,10 +653,10 @@ class ImageEncryptorGUI:
     
     def update_encrypt_button_state(self):
         """Update the encrypt button state based on current conditions"""
-        if self.current_image and self.encryption_key:
-            self.encrypt_btn.configure(state="normal")
-        else:
-            self.encrypt_btn.configure(state="disabled")
+        state = "normal" if self.current_image and self.encryption_key else "disabled"
+        # Skip the reconfigure and redraw when nothing changed
+        if self.encrypt_btn.cget("state") != state:
+            self.encrypt_btn.configure(state=state)
     
     def encrypt_image(self):
         """Encrypt the current image"""
@@ -550,49 +664,46 @@ class ImageEncryptorGUI:
             messagebox.showwarning("Warning", "Please select an image and generate a key first.")
             return
         
-        def encryption_task():
-            """Background encryption task"""
-            try:
-                progress_dialog.update_progress(0.1, "Converting image to bytes...")
-                
-                # Convert image to bytes
-                image_bytes, image_shape = self.image_processor.image_to_bytes(self.current_image)
-                
-                progress_dialog.update_progress(0.3, "Encrypting image data...")
-                
-                # Create encrypted package
-                filename = Path(self.current_image_path).name
-                package_bytes = self.encryptor.create_encrypted_package(
-                    image_bytes, self.encryption_key, filename, image_shape
-                )
-                
-                progress_dialog.update_progress(0.7, "Saving encrypted file...")
-                
-                # Save encrypted file
-                encrypted_filename = f"encrypted_{filename}.enc"
-                encrypted_path = Config.ENCRYPTED_DIR / encrypted_filename
-                
-                self.encryptor.save_encrypted_file(package_bytes, str(encrypted_path))
-                
-                progress_dialog.update_progress(1.0, "Encryption completed!")
-                
-                # Show success message
-                self.root.after(0, lambda: self.show_encryption_success(encrypted_path, filename))
-                
-            except Exception as e:
-                logger.error(f"Encryption failed: {str(e)}")
-                self.root.after(0, lambda: messagebox.showerror("Encryption Failed", str(e)))
-            finally:
-                if hasattr(self, 'progress_dialog') and not progress_dialog.cancelled:
-                    progress_dialog.destroy()
-        
         # Show progress dialog
         progress_dialog = ProgressDialog(self.root, "Encrypting Image...")
         
         # Start encryption in background thread
-        thread = threading.Thread(target=encryption_task, daemon=True)
+        thread = threading.Thread(
+            target=self._encrypt_worker,
+            args=(progress_dialog, self.current_image, self.current_image_name, self.encryption_key),
+            daemon=True
+        )
         thread.start()
     
+    def _encrypt_worker(self, progress_dialog, image, filename, key):
+        """Background encryption task"""
+        try:
+            progress_dialog.update_progress(0.1, "Converting image to bytes...")
+            
+            # Convert image to bytes
+            image_bytes, image_shape = self.image_processor.image_to_bytes(image)
+            
+            progress_dialog.update_progress(0.3, "Encrypting image data...")
+            
+            # Encrypt straight into the package file
+            encrypted_filename = f"encrypted_{filename}.enc"
+            encrypted_path = Config.ENCRYPTED_DIR / encrypted_filename
+            
+            self.encryptor.encrypt_to_file(
+                image_bytes, key, filename, image_shape, str(encrypted_path)
+            )
+            
+            progress_dialog.update_progress(1.0, "Encryption completed!")
+            
+            # Show success message
+            self.root.after(0, self.show_encryption_success, encrypted_path, filename)
+            
+        except Exception as e:
+            logger.error(f"Encryption failed: {str(e)}")
+            self.root.after(0, messagebox.showerror, "Encryption Failed", str(e))
+        finally:
+            progress_dialog.close()
+    
     def show_encryption_success(self, encrypted_path, original_filename):
         """Show encryption success message and offer save options"""
         # Ask user if they want to save the encrypted file somewhere else
@@ -632,7 +743,7 @@ class ImageEncryptorGUI:
             
             if save_path:
                 # Copy the encrypted file to the new location
-                shutil.copy2(encrypted_path, save_path)
+                shutil.copyfile(encrypted_path, save_path)
                 messagebox.showinfo(
                     "File Saved", 
                     f"Encrypted file saved to:\n{save_path}"
@@ -662,10 +773,11 @@ class ImageEncryptorGUI:
     def load_encrypted_file(self, file_path):
         """Load encrypted file information"""
         try:
+            # One open + fstat + header read; rejects non-package files up front
+            package_info = self.decryptor.inspect_package(file_path)
             self.encrypted_file_path = file_path
             
-            # Try to load basic file info
-            file_size = os.path.getsize(file_path) / 1024  # KB
+            file_size = package_info['file_size'] / 1024  # KB
             filename = Path(file_path).name
             
             # Update display
@@ -673,6 +785,9 @@ class ImageEncryptorGUI:
             
             info_text = f"Encrypted File: {filename}\n"
             info_text += f"Size: {file_size:.1f} KB\n"
+            if package_info['image_shape']:
+                width, height, _ = package_info['image_shape']
+                info_text += f"Image: {width}x{height} pixels\n"
             info_text += f"Path: {file_path}\n\n"
             info_text += "Enter the decryption key to decrypt this file."
             
@@ -693,7 +808,11 @@ class ImageEncryptorGUI:
     def paste_key(self):
         """Paste key from clipboard"""
         try:
-            clipboard_content = pyperclip.paste()
+            try:
+                clipboard_content = self.root.clipboard_get()
+            except tk.TclError:
+                # Raised when the clipboard is empty or holds no text
+                clipboard_content = ""
             if clipboard_content:
                 self.key_input.delete("1.0", "end")
                 self.key_input.insert("1.0", clipboard_content)
@@ -706,15 +825,16 @@ class ImageEncryptorGUI:
     
     def update_decrypt_button_state(self):
         """Update decrypt button state"""
-        key_text = self.key_input.get("1.0", "end").strip()
-        if hasattr(self, 'encrypted_file_path') and key_text:
-            self.decrypt_btn.configure(state="normal")
-        else:
-            self.decrypt_btn.configure(state="disabled")
+        # Compare the end index instead of pulling the whole text through Tcl
+        has_key_text = self.key_input.index("end-1c") != "1.0"
+        state = "normal" if self.encrypted_file_path and has_key_text else "disabled"
+        # Runs on every key release, so only reconfigure when the state changes
+        if self.decrypt_btn.cget("state") != state:
+            self.decrypt_btn.configure(state=state)
     
     def decrypt_image(self):
         """Decrypt the selected encrypted image"""
-        if not hasattr(self, 'encrypted_file_path'):
+        if not self.encrypted_file_path:
             messagebox.showwarning("Warning", "Please select an encrypted file first.")
             return
         
@@ -723,67 +843,71 @@ class ImageEncryptorGUI:
             messagebox.showwarning("Warning", "Please enter the decryption key.")
             return
         
-        def decryption_task():
-            """Background decryption task"""
-            try:
-                progress_dialog.update_progress(0.1, "Validating decryption key...")
-                
-                # Convert key string to bytes
-                decryption_key = self.key_manager.string_to_key(key_text)
-                
-                progress_dialog.update_progress(0.3, "Loading encrypted file...")
-                
-                # Decrypt the package
-                image_data, metadata = self.decryptor.decrypt_package(
-                    self.encrypted_file_path, decryption_key
-                )
-                
-                progress_dialog.update_progress(0.6, "Reconstructing image...")
-                
-                # Convert bytes back to image
-                image_shape = tuple(metadata['image_shape'])
-                decrypted_image = self.image_processor.bytes_to_image(image_data, image_shape)
-                
-                progress_dialog.update_progress(0.8, "Saving decrypted image...")
-                
-                # Save decrypted image
-                original_name = metadata['original_filename']
-                name_parts = Path(original_name).stem, Path(original_name).suffix
-                decrypted_filename = f"decrypted_{name_parts[0]}{name_parts[1]}"
-                decrypted_path = Config.DECRYPTED_DIR / decrypted_filename
-                
-                self.image_processor.save_image(decrypted_image, str(decrypted_path))
-                
-                progress_dialog.update_progress(1.0, "Decryption completed!")
-                
-                # Show success and preview
-                self.root.after(0, lambda: self.show_decryption_success(
-                    decrypted_image, decrypted_path, original_name
-                ))
-                
-            except Exception as e:
-                logger.error(f"Decryption failed: {str(e)}")
-                self.root.after(0, lambda: messagebox.showerror("Decryption Failed", str(e)))
-            finally:
-                if not progress_dialog.cancelled:
-                    progress_dialog.destroy()
-        
         # Show progress dialog
         progress_dialog = ProgressDialog(self.root, "Decrypting Image...")
         
         # Start decryption in background thread
-        thread = threading.Thread(target=decryption_task, daemon=True)
+        thread = threading.Thread(
+            target=self._decrypt_worker,
+            args=(progress_dialog, self.encrypted_file_path, key_text),
+            daemon=True
+        )
         thread.start()
     
-    def show_decryption_success(self, decrypted_image, decrypted_path, original_name):
+    def _decrypt_worker(self, progress_dialog, encrypted_file_path, key_text):
+        """Background decryption task"""
+        try:
+            progress_dialog.update_progress(0.1, "Validating decryption key...")
+            
+            # Convert key string to bytes
+            decryption_key = self.key_manager.string_to_key(key_text)
+            
+            progress_dialog.update_progress(0.3, "Loading encrypted file...")
+            
+            # Decrypt the package
+            image_data, metadata = self.decryptor.decrypt_package(
+                encrypted_file_path, decryption_key
+            )
+            
+            progress_dialog.update_progress(0.6, "Reconstructing image...")
+            
+            # Convert bytes back to image
+            image_shape = tuple(metadata['image_shape'])
+            decrypted_image = self.image_processor.bytes_to_image(image_data, image_shape)
+            # The image holds its own copy of the pixels; drop the raw buffer before saving
+            del image_data
+            
+            progress_dialog.update_progress(0.8, "Saving decrypted image...")
+            
+            # Save decrypted image
+            original_name = metadata['original_filename']
+            # stem + suffix is just the name; it also drops any directory part
+            decrypted_filename = f"decrypted_{Path(original_name).name}"
+            decrypted_path = Config.DECRYPTED_DIR / decrypted_filename
+            
+            self.image_processor.save_image(decrypted_image, str(decrypted_path))
+            
+            # Resample the preview here; only the PhotoImage has to be built on the main thread
+            preview = self.image_processor.resize_for_display(decrypted_image, (200, 200), fast=True)
+            
+            progress_dialog.update_progress(1.0, "Decryption completed!")
+            
+            # Show success and preview
+            self.root.after(
+                0, self.show_decryption_success, preview, decrypted_path, original_name
+            )
+            
+        except Exception as e:
+            logger.error(f"Decryption failed: {str(e)}")
+            self.root.after(0, messagebox.showerror, "Decryption Failed", str(e))
+        finally:
+            progress_dialog.close()
+    
+    def show_decryption_success(self, preview, decrypted_path, original_name):
         """Show decryption success and preview"""
         try:
             # Update preview
-            thumbnail = self.image_processor.create_thumbnail(decrypted_image, (200, 200))
-            if thumbnail:
-                self.decrypted_preview_label.configure(image=thumbnail, text="")
-                # Keep reference to prevent garbage collection
-                self.decrypted_preview_label._image_ref = thumbnail
+            self._set_preview_image(self.decrypted_preview_label, preview)
             
             # Update status
             self.decrypt_status.configure(
@@ -806,9 +930,6 @@ class ImageEncryptorGUI:
     def run(self):
         """Start the GUI application"""
         try:
-            # Bind key input events
-            self.key_input.bind('<KeyRelease>', lambda e: self.update_decrypt_button_state())
-            
             # Start main loop
             logger.info("Starting GUI main loop")
             self.root.mainloop()
@@ -816,6 +937,14 @@ class ImageEncryptorGUI:
         except Exception as e:
             logger.error(f"GUI error: {str(e)}")
             raise
+        finally:
+            # Pending previews are pointless once the window is gone
+            self.preview_pool.shutdown(wait=False, cancel_futures=True)
+            
+            # Forget cached ciphers and derived keys on exit
+            self.encryptor.close()
+            self.decryptor.close()
+            self.key_manager.clear_cache()
 
 if __name__ == "__main__":
     app = ImageEncryptorGUI()
@@ -0,0 +1,30 @@
+"""
+File utility functions shared by the atomic save paths
+"""
+
+import os
+import stat
+
+# os.umask can only be read by setting it, which races with other threads
+# creating files, so it is read once at import time
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def match_target_mode(tmp_path: str, target_path: str):
+    """
+    Give a temporary file the permissions its rename target should have
+    
+    mkstemp creates files with mode 0600 and os.replace keeps that mode, so
+    without this every save would narrow permissions.
+    
+    Args:
+        tmp_path: Temporary file about to be renamed
+        target_path: Final destination path
+    """
+    try:
+        # Replacing a file keeps the mode it already had
+        mode = stat.S_IMODE(os.stat(target_path).st_mode)
+    except FileNotFoundError:
+        # A new file gets the mode open() would give it under the user's umask
+        mode = 0o666 & ~_UMASK
+    os.chmod(tmp_path, mode)
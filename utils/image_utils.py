@@ -3,10 +3,13 @@ Image utility functions for loading, saving, and processing images
 """
 
 import os
-from PIL import Image, ImageTk
-import numpy as np
+import tempfile
+import threading
+from collections import OrderedDict
+from PIL import Image
 from pathlib import Path
 from config import Config
+from utils.file_utils import match_target_mode
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,6 +19,10 @@ class ImageProcessor:
     
     def __init__(self):
         self.supported_formats = Config.SUPPORTED_FORMATS
+        
+        # Previews by (path, mtime, file size, thumbnail size); filled from worker threads
+        self._thumbnail_cache = OrderedDict()
+        self._thumbnail_cache_lock = threading.Lock()
     
     def is_supported_format(self, file_path: str) -> bool:
         """
@@ -47,19 +54,16 @@ class ImageProcessor:
             if not self.is_supported_format(image_path):
                 raise ValueError(f"Unsupported image format: {Path(image_path).suffix}")
             
-            # Load and validate image
-            image = Image.open(image_path)
-            image.verify()  # Verify it's a valid image
-            
-            # Reload image after verification (PIL requirement)
+            # Opening parses the header and rejects non-images; pixel data is
+            # decoded lazily, so a corrupt body surfaces at first decode
             image = Image.open(image_path)
             
-            logger.info(f"Loaded image: {image_path} ({image.size[0]}x{image.size[1]})")
+            logger.info("Loaded image: %s (%dx%d)", image_path, image.size[0], image.size[1])
             
             return image
             
         except Exception as e:
-            logger.error(f"Failed to load image {image_path}: {str(e)}")
+            logger.error("Failed to load image %s: %s", image_path, e)
             raise Exception(f"Failed to load image: {str(e)}")
     
     def image_to_bytes(self, image: Image.Image) -> tuple:
@@ -73,25 +77,24 @@ class ImageProcessor:
             tuple: (image_bytes, image_shape)
         """
         try:
-            # Convert to RGB if necessary (for consistency)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Get image shape
+            # Packages always hold 3-channel RGB
             width, height = image.size
-            channels = len(image.getbands())
-            image_shape = (width, height, channels)
+            image_shape = (width, height, 3)
             
-            # Convert to numpy array and then to bytes
-            image_array = np.array(image)
-            image_bytes = image_array.tobytes()
+            # PIL's raw encoder already produces row-major RGB bytes, so going
+            # through a numpy array would only add a second full-size copy.
+            # RGBA/RGBX pack straight to RGB; other modes need a real conversion
+            if image.mode in ('RGB', 'RGBA', 'RGBX'):
+                image_bytes = image.tobytes('raw', 'RGB')
+            else:
+                image_bytes = image.convert('RGB').tobytes()
             
-            logger.debug(f"Converted image to bytes: {len(image_bytes)} bytes")
+            logger.debug("Converted image to bytes: %d bytes", len(image_bytes))
             
             return image_bytes, image_shape
             
         except Exception as e:
-            logger.error(f"Failed to convert image to bytes: {str(e)}")
+            logger.error("Failed to convert image to bytes: %s", e)
             raise Exception(f"Failed to convert image to bytes: {str(e)}")
     
     def bytes_to_image(self, image_bytes: bytes, image_shape: tuple) -> Image.Image:
@@ -108,28 +111,33 @@ class ImageProcessor:
         try:
             width, height, channels = image_shape
             
-            # Convert bytes to numpy array
-            image_array = np.frombuffer(image_bytes, dtype=np.uint8)
-            image_array = image_array.reshape((height, width, channels))
+            # image_to_bytes always stores packed RGB rows
+            if channels != 3:
+                raise ValueError(f"Unsupported channel count: {channels}")
+            if len(image_bytes) != width * height * channels:
+                raise ValueError("Image data does not match image dimensions")
             
-            # Convert to PIL Image
-            image = Image.fromarray(image_array, 'RGB')
+            # PIL's raw decoder reads the packed rows directly; no numpy round trip
+            image = Image.frombuffer('RGB', (width, height), image_bytes, 'raw', 'RGB', 0, 1)
             
-            logger.debug(f"Converted bytes to image: {width}x{height}")
+            logger.debug("Converted bytes to image: %dx%d", width, height)
             
             return image
             
         except Exception as e:
-            logger.error(f"Failed to convert bytes to image: {str(e)}")
+            logger.error("Failed to convert bytes to image: %s", e)
             raise Exception(f"Failed to convert bytes to image: {str(e)}")
     
-    def resize_for_display(self, image: Image.Image, max_size: tuple = (300, 300)) -> Image.Image:
+    def resize_for_display(self, image: Image.Image, max_size: tuple = (300, 300),
+                           fast: bool = False) -> Image.Image:
         """
         Resize image for display while maintaining aspect ratio
         
         Args:
             image: PIL Image to resize
             max_size: Maximum dimensions (width, height)
+            fast: Use an area-averaging box filter instead of Lanczos when
+                shrinking by more than half
             
         Returns:
             PIL.Image: Resized image
@@ -144,42 +152,65 @@ class ImageProcessor:
             new_width = int(image.size[0] * scale_factor)
             new_height = int(image.size[1] * scale_factor)
             
-            # Resize image
-            resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Box filtering averages each source area once; Lanczos is several times
+            # slower on large downscales and only matters where fidelity does.
+            # Near 1:1 or when enlarging, a box filter degrades to blocky sampling
+            if fast and scale_factor < 0.5:
+                resample = Image.Resampling.BOX
+            else:
+                resample = Image.Resampling.LANCZOS
+            # reducing_gap box-reduces large downscales to about 3x the target
+            # first, so Lanczos only filters the last step
+            resized_image = image.resize((new_width, new_height), resample, reducing_gap=3.0)
             
-            logger.debug(f"Resized image from {image.size} to {resized_image.size}")
+            logger.debug("Resized image from %s to %s", image.size, resized_image.size)
             
             return resized_image
             
         except Exception as e:
-            logger.error(f"Failed to resize image: {str(e)}")
+            logger.error("Failed to resize image: %s", e)
             return image  # Return original if resize fails
     
-    def create_thumbnail(self, image: Image.Image, size: tuple = (150, 150)) -> ImageTk.PhotoImage:
+    def load_thumbnail(self, image_path: str, size: tuple = (150, 150)) -> Image.Image:
         """
-        Create a thumbnail for GUI display
+        Decode a reduced-size preview straight from file
         
         Args:
-            image: PIL Image
-            size: Thumbnail size
+            image_path: Path to image file
+            size: Maximum thumbnail dimensions (width, height)
             
         Returns:
-            ImageTk.PhotoImage: Thumbnail for tkinter display
+            PIL.Image: Thumbnail image, or None on failure
         """
         try:
-            # Resize image
-            thumbnail = self.resize_for_display(image, size)
+            stat = os.stat(image_path)
+            cache_key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, tuple(size))
+            with self._thumbnail_cache_lock:
+                cached = self._thumbnail_cache.get(cache_key)
+                if cached is not None:
+                    self._thumbnail_cache.move_to_end(cache_key)
+                    return cached
+            
+            # Use a separate handle so the full-resolution image stays untouched
+            with Image.open(image_path) as image:
+                # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale; no-op for other formats.
+                # Draft to twice the target so the final resample still has detail to work with
+                image.draft('RGB', (size[0] * 2, size[1] * 2))
+                # thumbnail() resizes in place, so no copy of the decoded image is made;
+                # reducing_gap box-reduces first and leaves Lanczos only the last 2x
+                image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            
+            with self._thumbnail_cache_lock:
+                self._thumbnail_cache[cache_key] = image
+                if len(self._thumbnail_cache) > Config.THUMBNAIL_CACHE_SIZE:
+                    self._thumbnail_cache.popitem(last=False)
+            
+            logger.debug("Loaded thumbnail: %s", image.size)
             
-            # Convert to PhotoImage for tkinter
-            photo = ImageTk.PhotoImage(thumbnail)
-            
-            logger.debug(f"Created thumbnail: {thumbnail.size}")
-            
-            return photo
+            return image
             
         except Exception as e:
-            logger.error(f"Failed to create thumbnail: {str(e)}")
-            # Return a placeholder or None
+            logger.error("Failed to load thumbnail for %s: %s", image_path, e)
             return None
     
     def save_image(self, image: Image.Image, output_path: str, quality: int = 95):
@@ -192,18 +223,37 @@ class ImageProcessor:
             quality: JPEG quality (0-100)
         """
         try:
-            # Ensure output directory exists
-            output_dir = Path(output_path).parent
-            output_dir.mkdir(parents=True, exist_ok=True)
+            path = Path(output_path)
             
-            # Save image
-            if Path(output_path).suffix.lower() in ['.jpg', '.jpeg']:
-                image.save(output_path, 'JPEG', quality=quality)
+            # Ensure output directory exists
+            path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # The temporary file has no meaningful extension, so pick the format here
+            suffix = path.suffix.lower()
+            if suffix in ('.jpg', '.jpeg'):
+                image_format, save_options = 'JPEG', {'quality': quality}
+            elif suffix == '.png':
+                # PNG is lossless at any level; level 1 saves several times faster than the default 6
+                image_format, save_options = 'PNG', {'compress_level': 1}
             else:
-                image.save(output_path)
-            
-            logger.info(f"Saved image to: {output_path}")
+                image_format, save_options = Image.registered_extensions().get(suffix), {}
+                if image_format is None:
+                    raise ValueError(f"Unsupported image format: {path.suffix}")
+            
+            # Write next to the destination and rename into place, so a failed
+            # save never leaves a partial image or clobbers an existing one
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb', buffering=Config.IO_BUFFER_SIZE) as f:
+                    image.save(f, image_format, **save_options)
+                match_target_mode(tmp_path, path)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            
+            logger.info("Saved image to: %s", output_path)
             
         except Exception as e:
-            logger.error(f"Failed to save image to {output_path}: {str(e)}")
+            logger.error("Failed to save image to %s: %s", output_path, e)
             raise Exception(f"Failed to save image: {str(e)}")
@@ -2,8 +2,11 @@
 Logging configuration and utilities
 """
 
+import atexit
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
 from config import Config
@@ -22,19 +25,35 @@ def setup_logger() -> logging.Logger:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = Config.LOGS_DIR / f"image_encryptor_{timestamp}.log"
     
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    stream_handler = logging.StreamHandler()  # Also log to console
+    file_handler.setFormatter(formatter)
+    stream_handler.setFormatter(formatter)
+    
+    # Callers only enqueue records; a listener thread formats and writes them,
+    # so file and console I/O never block the GUI or worker threads
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # The queue handler only merges the message arguments; the real
+    # formatting happens on the listener's handlers
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
     # Configure logging
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler()  # Also log to console
-        ]
+        handlers=[queue_handler]
     )
     
     logger = logging.getLogger('ImageEncryptor')
-    logger.info(f"Logging initialized - Log file: {log_file}")
+    logger.info("Logging initialized - Log file: %s", log_file)
     
     return logger
 